@@ -3,7 +3,7 @@ Flask API for Thalassemia Transfusion Prediction
 Provides ML-based prediction for next transfusion date
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
 import joblib
 import numpy as np
@@ -12,6 +12,7 @@ from datetime import datetime, timedelta
 import json
 import os
 from dotenv import load_dotenv
+from drift_monitor import DriftMonitor
 
 load_dotenv()
 
@@ -22,10 +23,11 @@ CORS(app)  # Enable CORS for all routes
 model = None
 model_info = None
 feature_columns = None
+drift_monitor = None
 
 def load_model():
     """Load the trained model and metadata"""
-    global model, model_info, feature_columns
+    global model, model_info, feature_columns, drift_monitor
     
     model_path = os.path.join('models', 'transfusion_predictor.pkl')
     info_path = os.path.join('models', 'model_info.json')
@@ -39,6 +41,11 @@ def load_model():
         with open(info_path, 'r') as f:
             model_info = json.load(f)
         feature_columns = model_info.get('feature_columns', [])
+        reference_sketches = model_info.get('reference_sketches')
+        if reference_sketches:
+            drift_monitor = DriftMonitor(reference_sketches)
+        else:
+            print("Warning: No reference sketches in model info. Retrain to enable drift monitoring.")
         print(f"Model loaded successfully. Version: {model_info.get('model_version', 'unknown')}")
         return True
     except Exception as e:
@@ -112,9 +119,9 @@ def rule_based_prediction(history, last_hb, age, weight_kg, current_date):
         'method': 'rule_based',
     }
 
-def prepare_features(history, last_hb, age, weight_kg, comorbidities, current_date):
+def compute_feature_row(history, last_hb, age, weight_kg, comorbidities, current_date):
     """
-    Prepare features for model prediction
+    Compute model features for one patient as a plain dict
     """
     if not history or len(history) < 1:
         return None  # Insufficient data
@@ -161,8 +168,7 @@ def prepare_features(history, last_hb, age, weight_kg, comorbidities, current_da
     last_transfusion = sorted_history[-1]
     last_units = last_transfusion.get('units', 1)
     
-    # Create feature vector
-    features = pd.DataFrame([{
+    return {
         'mean_interval_days': mean_interval,
         'hb_trend': hb_trend,
         'units_per_transfusion_avg': avg_units,
@@ -174,9 +180,18 @@ def prepare_features(history, last_hb, age, weight_kg, comorbidities, current_da
         'has_comorbidities': has_comorbidities,
         'last_hb': last_hb,
         'last_units': last_units,
-    }])
+    }
+
+def prepare_features(history, last_hb, age, weight_kg, comorbidities, current_date):
+    """
+    Prepare features for model prediction
+    """
+    row = compute_feature_row(history, last_hb, age, weight_kg, comorbidities, current_date)
+    if row is None:
+        return None  # Insufficient data
     
-    return features
+    # Create feature vector
+    return pd.DataFrame([row])
 
 @app.route('/health', methods=['GET'])
 def health_check():
@@ -204,6 +219,28 @@ def model_info_endpoint():
         'feature_importance': model_info.get('feature_importance'),
     })
 
+@app.route('/drift', methods=['GET'])
+def drift_endpoint():
+    """
+    Compare serving feature distribution with the training reference
+    
+    Query Params:
+        reset=true  Clear serving sketches after reporting
+    """
+    if drift_monitor is None:
+        return jsonify({
+            'error': 'Drift monitoring unavailable (model or reference sketches not loaded)',
+        }), 404
+    
+    report = drift_monitor.report()
+    report['model_version'] = model_info.get('model_version')
+    report['timestamp'] = datetime.now().isoformat()
+    
+    if request.args.get('reset', '').lower() == 'true':
+        drift_monitor.reset()
+    
+    return jsonify(report)
+
 @app.route('/predict-next-transfusion', methods=['POST'])
 def predict_next_transfusion():
     """
@@ -275,6 +312,10 @@ def predict_next_transfusion():
                 # Ensure features match model expectations
                 features_aligned = features[feature_columns]
                 
+                # Track serving distribution for drift monitoring
+                if drift_monitor is not None:
+                    drift_monitor.update(features_aligned)
+                
                 # Make prediction
                 predicted_days = model.predict(features_aligned)[0]
                 predicted_days = max(7, predicted_days)  # Minimum 7 days
@@ -322,6 +363,151 @@ def predict_next_transfusion():
             'error': f'Prediction failed: {str(e)}'
         }), 500
 
+# Patients per vectorized model call on the streaming route
+STREAM_CHUNK_SIZE = int(os.getenv('STREAM_CHUNK_SIZE', 1000))
+
+def predict_batch(records):
+    """
+    Predict next transfusion for a list of patient payloads in one model call
+    
+    Returns one result dict per record, in order. Invalid records yield an
+    {"error": ...} result instead of failing the whole batch.
+    """
+    results = [None] * len(records)
+    parsed = [None] * len(records)
+    ml_indices = []
+    ml_rows = []
+    
+    required_fields = ['history', 'lastHb', 'age', 'weightKg', 'currentDate']
+    
+    for i, data in enumerate(records):
+        patient_id = data.get('patientId', 'unknown') if isinstance(data, dict) else 'unknown'
+        try:
+            missing_fields = [f for f in required_fields if f not in data]
+            if missing_fields:
+                results[i] = {
+                    'error': f'Missing required fields: {", ".join(missing_fields)}',
+                    'patientId': patient_id,
+                }
+                continue
+            
+            history = data.get('history', [])
+            last_hb = float(data['lastHb'])
+            age = int(data['age'])
+            weight_kg = float(data['weightKg'])
+            comorbidities = data.get('comorbidities', [])
+            current_date = data['currentDate']
+            parsed[i] = (history, last_hb, age, weight_kg, current_date, patient_id)
+            
+            row = compute_feature_row(history, last_hb, age, weight_kg, comorbidities, current_date)
+            if model is not None and row is not None:
+                # Extra Thalassemia parameters are reported, not used by the model
+                for field in ('ferritin', 'sgpt', 'sgot', 'creatinine'):
+                    if data.get(field):
+                        row[field] = float(data[field])
+                ml_indices.append(i)
+                ml_rows.append(row)
+        except Exception as e:
+            results[i] = {
+                'error': f'Prediction failed: {str(e)}',
+                'patientId': patient_id,
+            }
+    
+    if ml_rows:
+        try:
+            features = pd.DataFrame(ml_rows)
+            features_aligned = features[feature_columns]
+            
+            if drift_monitor is not None:
+                drift_monitor.update(features_aligned)
+            
+            predictions = np.maximum(7, model.predict(features_aligned))  # Minimum 7 days
+            
+            feature_importance = model_info.get('feature_importance', {})
+            top_feature = max(feature_importance, key=feature_importance.get) if feature_importance else 'mean_interval_days'
+            
+            for i, row, predicted_days in zip(ml_indices, ml_rows, predictions):
+                history, _, _, _, _, patient_id = parsed[i]
+                last_transfusion_date = datetime.strptime(history[-1]['date'], '%Y-%m-%d')
+                predicted_date = last_transfusion_date + timedelta(days=int(predicted_days))
+                
+                results[i] = {
+                    'predictedNextDate': predicted_date.strftime('%Y-%m-%d'),
+                    'confidence': 0.85,  # Based on test MAE coverage
+                    'explanation': f'ML prediction based on: {top_feature} (primary factor), mean interval {row["mean_interval_days"]:.1f} days, Hb trend {row["hb_trend"]:.2f}',
+                    'method': 'ml',
+                    'predictedDays': int(predicted_days),
+                    'features': {k: float(v) for k, v in row.items()},
+                    'patientId': patient_id,
+                }
+        except Exception as e:
+            print(f"ML batch prediction error: {e}. Falling back to rule-based.")
+            # Fall through to rule-based
+    
+    # Rule-based fallback for everything not predicted above
+    for i, args in enumerate(parsed):
+        if results[i] is not None or args is None:
+            continue
+        history, last_hb, age, weight_kg, current_date, patient_id = args
+        try:
+            result = rule_based_prediction(history, last_hb, age, weight_kg, current_date)
+            result['patientId'] = patient_id
+        except Exception as e:
+            result = {
+                'error': f'Prediction failed: {str(e)}',
+                'patientId': patient_id,
+            }
+        results[i] = result
+    
+    return results
+
+@app.route('/predict-next-transfusion/stream', methods=['POST'])
+def predict_next_transfusion_stream():
+    """
+    Streaming cohort prediction over newline-delimited JSON
+    
+    Request Body (application/x-ndjson), one patient per line, same schema
+    as /predict-next-transfusion:
+        {"patientId": "p1", "history": [...], "lastHb": 8.0, ...}
+        {"patientId": "p2", "history": [...], "lastHb": 9.1, ...}
+    
+    Response (application/x-ndjson): one result per input line, in order,
+    emitted as each chunk of STREAM_CHUNK_SIZE patients completes. Lines that
+    fail to parse or validate produce {"error": ..., "line": n}.
+    """
+    def generate():
+        chunk = []
+        line_numbers = []
+        
+        def flush():
+            for line_number, result in zip(line_numbers, predict_batch(chunk)):
+                if 'error' in result:
+                    result['line'] = line_number
+                yield app.json.dumps(result) + '\n'
+            chunk.clear()
+            line_numbers.clear()
+        
+        for line_number, raw_line in enumerate(request.stream, 1):
+            raw_line = raw_line.strip()
+            if not raw_line:
+                continue
+            
+            try:
+                record = json.loads(raw_line)
+            except ValueError as e:
+                yield from flush()  # Keep output in input order
+                yield app.json.dumps({'error': f'Invalid JSON: {str(e)}', 'line': line_number}) + '\n'
+                continue
+            
+            chunk.append(record)
+            line_numbers.append(line_number)
+            if len(chunk) >= STREAM_CHUNK_SIZE:
+                yield from flush()
+        
+        yield from flush()
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 if __name__ == '__main__':
     # Load model on startup
     print("Loading transfusion prediction model...")
@@ -335,5 +521,6 @@ if __name__ == '__main__':
     print(f"\nStarting ThalAI ML Service on port {port}...")
     print(f"Health check: http://localhost:{port}/health")
     print(f"Prediction endpoint: http://localhost:{port}/predict-next-transfusion")
+    print(f"Streaming endpoint: http://localhost:{port}/predict-next-transfusion/stream")
     
     app.run(host='0.0.0.0', port=port, debug=False)
@@ -0,0 +1,188 @@
+"""
+Streaming Feature Drift Monitor
+Keeps constant-memory histogram sketches of serving features and compares
+them with the reference sketches saved in model_info.json at training time
+"""
+
+import threading
+import numpy as np
+
+# Number of quantile bins used for the reference sketches
+DEFAULT_N_BINS = 10
+
+# Small constant to avoid log(0) / division by zero in PSI
+PSI_EPSILON = 1e-4
+
+# Common PSI thresholds: < 0.1 stable, 0.1-0.25 moderate shift, > 0.25 significant
+PSI_WARNING_THRESHOLD = 0.1
+PSI_ALERT_THRESHOLD = 0.25
+
+def build_reference_sketches(df, feature_columns, n_bins=DEFAULT_N_BINS):
+    """
+    Build reference sketches from the training feature matrix
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        Training features
+    feature_columns : list
+        Columns to sketch
+    n_bins : int
+        Number of quantile bins per feature
+
+    Returns:
+    --------
+    dict
+        JSON-serializable sketches keyed by feature name:
+        {"edges": [...], "counts": [...], "count": n, "mean": m, "std": s}
+    """
+    sketches = {}
+    quantiles = np.linspace(0, 1, n_bins + 1)[1:-1]
+
+    for feature in feature_columns:
+        values = df[feature].dropna().to_numpy(dtype=float)
+        if len(values) == 0:
+            continue
+
+        # Interior quantile edges; discrete features collapse to fewer bins
+        edges = np.unique(np.quantile(values, quantiles))
+        counts = np.bincount(np.searchsorted(edges, values, side='left'), minlength=len(edges) + 1)
+
+        sketches[feature] = {
+            'edges': edges.tolist(),
+            'counts': counts.tolist(),
+            'count': int(len(values)),
+            'mean': float(values.mean()),
+            'std': float(values.std()),
+        }
+
+    return sketches
+
+def population_stability_index(expected_counts, actual_counts):
+    """Population Stability Index between two binned distributions"""
+    expected = np.asarray(expected_counts, dtype=float)
+    actual = np.asarray(actual_counts, dtype=float)
+    expected_pct = np.maximum(expected / max(expected.sum(), 1), PSI_EPSILON)
+    actual_pct = np.maximum(actual / max(actual.sum(), 1), PSI_EPSILON)
+    return float(np.sum((actual_pct - expected_pct) * np.log(actual_pct / expected_pct)))
+
+def ks_statistic(expected_counts, actual_counts):
+    """Kolmogorov-Smirnov statistic (max CDF gap) over shared bins"""
+    expected = np.asarray(expected_counts, dtype=float)
+    actual = np.asarray(actual_counts, dtype=float)
+    expected_cdf = np.cumsum(expected) / max(expected.sum(), 1)
+    actual_cdf = np.cumsum(actual) / max(actual.sum(), 1)
+    return float(np.max(np.abs(expected_cdf - actual_cdf)))
+
+class DriftMonitor:
+    """
+    Thread-safe streaming drift monitor
+
+    Each feature keeps one fixed-size count array aligned with the reference
+    bin edges plus running count/sum/sum-of-squares, so memory does not grow
+    with traffic and each update is a binary search per feature.
+    """
+
+    def __init__(self, reference_sketches, min_samples=30):
+        self.reference = reference_sketches or {}
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+        self._edges = {f: np.asarray(s['edges'], dtype=float) for f, s in self.reference.items()}
+        self.reset()
+
+    def reset(self):
+        """Clear all serving-side sketches"""
+        with self._lock:
+            self._counts = {f: np.zeros(len(e) + 1, dtype=np.int64) for f, e in self._edges.items()}
+            self._n = {f: 0 for f in self._edges}
+            self._sum = {f: 0.0 for f in self._edges}
+            self._sum_sq = {f: 0.0 for f in self._edges}
+
+    def update(self, features):
+        """
+        Add serving feature rows to the sketches
+
+        Parameters:
+        -----------
+        features : pd.DataFrame
+            One or more rows of prepared features
+        """
+        if not self._edges or features is None:
+            return
+
+        with self._lock:
+            for feature, edges in self._edges.items():
+                if feature not in features:
+                    continue
+                values = features[feature].to_numpy(dtype=float)
+                values = values[~np.isnan(values)]
+                if len(values) == 0:
+                    continue
+                bins = np.searchsorted(edges, values, side='left')
+                np.add.at(self._counts[feature], bins, 1)
+                self._n[feature] += len(values)
+                self._sum[feature] += float(values.sum())
+                self._sum_sq[feature] += float(np.dot(values, values))
+
+    def report(self):
+        """
+        Compare serving sketches with the reference sketches
+
+        Returns:
+        --------
+        dict
+            Per-feature PSI/KS scores and an overall retraining recommendation
+        """
+        with self._lock:
+            counts = {f: c.copy() for f, c in self._counts.items()}
+            n = dict(self._n)
+            sums = dict(self._sum)
+            sums_sq = dict(self._sum_sq)
+
+        features = {}
+        drifted = []
+
+        for feature, ref in self.reference.items():
+            n_serving = n[feature]
+            entry = {
+                'reference_count': ref['count'],
+                'serving_count': n_serving,
+                'reference_mean': ref['mean'],
+            }
+
+            if n_serving < self.min_samples:
+                entry['status'] = 'insufficient_data'
+                features[feature] = entry
+                continue
+
+            psi = population_stability_index(ref['counts'], counts[feature])
+            mean = sums[feature] / n_serving
+            variance = max(sums_sq[feature] / n_serving - mean * mean, 0.0)
+
+            if psi >= PSI_ALERT_THRESHOLD:
+                status = 'drift'
+                drifted.append(feature)
+            elif psi >= PSI_WARNING_THRESHOLD:
+                status = 'warning'
+            else:
+                status = 'stable'
+
+            entry.update({
+                'psi': psi,
+                'ks': ks_statistic(ref['counts'], counts[feature]),
+                'serving_mean': mean,
+                'serving_std': float(np.sqrt(variance)),
+                'status': status,
+            })
+            features[feature] = entry
+
+        return {
+            'features': features,
+            'drifted_features': drifted,
+            'retrain_recommended': len(drifted) > 0,
+            'thresholds': {
+                'psi_warning': PSI_WARNING_THRESHOLD,
+                'psi_alert': PSI_ALERT_THRESHOLD,
+                'min_samples': self.min_samples,
+            },
+        }
@@ -6,81 +6,82 @@ Generates realistic transfusion patterns for model training
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-import random
+from concurrent.futures import ProcessPoolExecutor
+import os
 
-def generate_synthetic_transfusion_history(n_patients=100, seed=42):
+# Patients per partition. Each partition owns one SeedSequence child stream, so
+# output depends only on (n_patients, seed, partition_size), not on worker count.
+DEFAULT_PARTITION_SIZE = 5000
+
+# Common thalassemia comorbidities
+COMORBIDITIES_LIST = [
+    [],
+    ['iron_overload'],
+    ['iron_overload', 'hepatitis'],
+    ['diabetes'],
+    ['heart_disease'],
+    ['iron_overload', 'diabetes'],
+]
+
+def _partition_ranges(n_patients, partition_size):
+    """Split patient ids 1..n_patients into contiguous [start, stop) ranges"""
+    return [
+        (start, min(start + partition_size, n_patients + 1))
+        for start in range(1, n_patients + 1, partition_size)
+    ]
+
+def _generate_partition(patient_range, seed_seq, end_date):
     """
-    Generate synthetic transfusion history data for training ML model
+    Generate transfusion history for one contiguous range of patient ids
     
-    Parameters:
-    -----------
-    n_patients : int
-        Number of patients to generate data for
-    seed : int
-        Random seed for reproducibility
-    
-    Returns:
-    --------
-    pd.DataFrame
-        DataFrame with columns: patientId, date, units, hb_value, age, weightKg, comorbidities
+    Uses a private Generator seeded from seed_seq, so partitions can run in
+    any process without sharing global random state.
     """
-    np.random.seed(seed)
-    random.seed(seed)
-    
+    rng = np.random.default_rng(seed_seq)
     data = []
     
-    # Common thalassemia comorbidities
-    comorbidities_list = [
-        [],
-        ['iron_overload'],
-        ['iron_overload', 'hepatitis'],
-        ['diabetes'],
-        ['heart_disease'],
-        ['iron_overload', 'diabetes'],
-    ]
-    
-    for patient_id in range(1, n_patients + 1):
+    for patient_id in range(*patient_range):
         # Patient characteristics
-        age = np.random.randint(5, 50)  # Age range for thalassemia patients
-        weight = np.random.uniform(20, 80)  # Weight in kg
-        comorbidities = random.choice(comorbidities_list)
+        age = int(rng.integers(5, 50))  # Age range for thalassemia patients
+        weight = rng.uniform(20, 80)  # Weight in kg
+        comorbidities = COMORBIDITIES_LIST[rng.integers(len(COMORBIDITIES_LIST))]
         
         # Determine base transfusion interval (varies by patient)
         # Thalassemia patients typically need transfusions every 2-4 weeks
-        base_interval_days = np.random.choice([14, 21, 28, 30, 35], p=[0.2, 0.3, 0.3, 0.15, 0.05])
+        base_interval_days = rng.choice([14, 21, 28, 30, 35], p=[0.2, 0.3, 0.3, 0.15, 0.05])
         
         # Variability in interval (some patients have irregular patterns)
-        interval_variability = np.random.uniform(0.7, 1.3)
+        interval_variability = rng.uniform(0.7, 1.3)
         
         # Generate 12-24 months of history
-        start_date = datetime.now() - timedelta(days=365 * 2)
+        start_date = end_date - timedelta(days=365 * 2)
         current_date = start_date
         
         # Initial Hb value (thalassemia patients typically have low Hb)
-        current_hb = np.random.uniform(7.0, 9.5)
+        current_hb = rng.uniform(7.0, 9.5)
         
         # Generate transfusion history
         n_transfusions = 0
-        max_transfusions = np.random.randint(12, 24)
+        max_transfusions = rng.integers(12, 24)
         
-        while n_transfusions < max_transfusions and current_date < datetime.now():
+        while n_transfusions < max_transfusions and current_date < end_date:
             # Calculate interval with some variability
-            interval = int(base_interval_days * interval_variability * np.random.uniform(0.8, 1.2))
+            interval = int(base_interval_days * interval_variability * rng.uniform(0.8, 1.2))
             current_date += timedelta(days=interval)
             
-            if current_date > datetime.now():
+            if current_date > end_date:
                 break
             
             # Hb value before transfusion (decreases over time)
             # Hb drops between transfusions (typically 1-2 g/dL over 2-4 weeks)
-            hb_before = current_hb - np.random.uniform(0.5, 2.0)
+            hb_before = current_hb - rng.uniform(0.5, 2.0)
             hb_before = max(5.0, min(10.0, hb_before))  # Keep in realistic range
             
             # Units transfused (typically 1-3 units)
-            units = np.random.choice([1, 2, 3], p=[0.2, 0.6, 0.2])
+            units = rng.choice([1, 2, 3], p=[0.2, 0.6, 0.2])
             
             # Hb value after transfusion (increases by ~1 g/dL per unit)
-            hb_after = min(12.0, hb_before + (units * np.random.uniform(0.8, 1.2)))
+            hb_after = min(12.0, hb_before + (units * rng.uniform(0.8, 1.2)))
             current_hb = hb_after
             
             # Some seasonal variation (more transfusions needed in winter/infections)
@@ -95,7 +96,7 @@ def generate_synthetic_transfusion_history(n_patients=100, seed=42):
             data.append({
                 'patientId': f'patient_{patient_id}',
                 'date': current_date.strftime('%Y-%m-%d'),
-                'units': round(units, 1),
+                'units': round(float(units), 1),
                 'hb_value': round(hb_before, 1),  # Hb before transfusion
                 'age': age,
                 'weightKg': round(weight, 1),
@@ -117,6 +118,100 @@ def generate_synthetic_transfusion_history(n_patients=100, seed=42):
     
     return df
 
+def generate_synthetic_transfusion_history(n_patients=100, seed=42, end_date=None,
+                                           partition_size=DEFAULT_PARTITION_SIZE):
+    """
+    Generate synthetic transfusion history data for training ML model
+    
+    Parameters:
+    -----------
+    n_patients : int
+        Number of patients to generate data for
+    seed : int
+        Random seed for reproducibility
+    end_date : datetime, optional
+        Last possible transfusion date (defaults to now)
+    partition_size : int
+        Patients per seed stream; must match generate_training_data_parallel
+        for identical output
+    
+    Returns:
+    --------
+    pd.DataFrame
+        DataFrame with columns: patientId, date, units, hb_value, age, weightKg, comorbidities
+    """
+    end_date = end_date or datetime.now()
+    ranges = _partition_ranges(n_patients, partition_size)
+    seed_seqs = np.random.SeedSequence(seed).spawn(len(ranges))
+    
+    partitions = [
+        _generate_partition(patient_range, seed_seq, end_date)
+        for patient_range, seed_seq in zip(ranges, seed_seqs)
+    ]
+    return pd.concat(partitions, ignore_index=True)
+
+def _generate_training_partition(index, patient_range, seed_seq, end_date, output_dir):
+    """Worker task: generate one partition, engineer features, optionally write it"""
+    training_df = prepare_training_features(_generate_partition(patient_range, seed_seq, end_date))
+    
+    if output_dir:
+        training_df.to_csv(os.path.join(output_dir, f'part-{index:05d}.csv'), index=False)
+    
+    return training_df
+
+def generate_training_data_parallel(n_patients=100, seed=42, n_workers=None, end_date=None,
+                                    partition_size=DEFAULT_PARTITION_SIZE, output_dir=None):
+    """
+    Generate synthetic history and training features across a process pool
+    
+    The patient range is split into fixed-size partitions, each with its own
+    SeedSequence child stream, so the result is identical for any n_workers.
+    
+    Parameters:
+    -----------
+    n_patients : int
+        Number of patients to generate data for
+    seed : int
+        Root seed for the partition seed streams
+    n_workers : int, optional
+        Worker processes (defaults to CPU count; 1 runs in-process)
+    end_date : datetime, optional
+        Last possible transfusion date (defaults to now; pass a fixed date
+        for results reproducible across runs)
+    partition_size : int
+        Patients per partition / seed stream
+    output_dir : str, optional
+        If set, each partition is written to output_dir/part-NNNNN.csv
+    
+    Returns:
+    --------
+    pd.DataFrame
+        Training features, ordered by partition
+    """
+    n_workers = n_workers or os.cpu_count() or 1
+    end_date = end_date or datetime.now()
+    ranges = _partition_ranges(n_patients, partition_size)
+    seed_seqs = np.random.SeedSequence(seed).spawn(len(ranges))
+    
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    
+    tasks = (
+        range(len(ranges)),
+        ranges,
+        seed_seqs,
+        [end_date] * len(ranges),
+        [output_dir] * len(ranges),
+    )
+    
+    if n_workers == 1 or len(ranges) == 1:
+        partitions = list(map(_generate_training_partition, *tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=min(n_workers, len(ranges))) as executor:
+            partitions = list(executor.map(_generate_training_partition, *tasks))
+    
+    return pd.concat(partitions, ignore_index=True)
+
 def prepare_training_features(df):
     """
     Prepare features for model training
@@ -134,8 +229,8 @@ def prepare_training_features(df):
     # Group by patient to compute patient-level features
     patient_features = []
     
-    for patient_id in df['patientId'].unique():
-        patient_data = df[df['patientId'] == patient_id].sort_values('date')
+    for patient_id, patient_data in df.groupby('patientId', sort=False):
+        patient_data = patient_data.sort_values('date')
         
         if len(patient_data) < 2:
             continue  # Need at least 2 transfusions to compute interval
@@ -155,9 +250,11 @@ def prepare_training_features(df):
         avg_units = patient_data['units'].mean()
         
         # For each transfusion (except last), predict next date
-        for idx in range(len(patient_data) - 1):
-            current_row = patient_data.iloc[idx]
-            next_row = patient_data.iloc[idx + 1]
+        # (plain dict records avoid per-row Series construction from iloc)
+        records = patient_data.to_dict('records')
+        for idx in range(len(records) - 1):
+            current_row = records[idx]
+            next_row = records[idx + 1]
             
             # Days since last transfusion at this point
             days_since_last = current_row['days_since_last_transfusion'] if idx > 0 else mean_interval
@@ -11,9 +11,10 @@ from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 import joblib
 import os
 from datetime import datetime
-from synthetic_data_generator import generate_synthetic_transfusion_history, prepare_training_features
+from synthetic_data_generator import generate_training_data_parallel
+from drift_monitor import build_reference_sketches
 
-def train_model(n_patients=200, test_size=0.2, random_state=42):
+def train_model(n_patients=200, test_size=0.2, random_state=42, n_workers=1):
     """
     Train LightGBM model for transfusion prediction
     
@@ -25,6 +26,9 @@ def train_model(n_patients=200, test_size=0.2, random_state=42):
         Test set size (0.2 = 20%)
     random_state : int
         Random seed for reproducibility
+    n_workers : int
+        Worker processes for data generation (None = all CPUs); the
+        generated data does not depend on this value
     
     Returns:
     --------
@@ -39,14 +43,11 @@ def train_model(n_patients=200, test_size=0.2, random_state=42):
     print("Training Transfusion Prediction Model")
     print("=" * 60)
     
-    # Generate synthetic data
-    print(f"\n1. Generating synthetic data for {n_patients} patients...")
-    df = generate_synthetic_transfusion_history(n_patients=n_patients, seed=random_state)
-    print(f"   Generated {len(df)} transfusion records")
-    
-    # Prepare training features
-    print("\n2. Preparing training features...")
-    training_df = prepare_training_features(df)
+    # Generate synthetic data and training features
+    print(f"\n1. Generating synthetic data and training features for {n_patients} patients...")
+    training_df = generate_training_data_parallel(
+        n_patients=n_patients, seed=random_state, n_workers=n_workers
+    )
     print(f"   Prepared {len(training_df)} training samples")
     
     # Feature columns (excluding target and metadata)
@@ -68,7 +69,7 @@ def train_model(n_patients=200, test_size=0.2, random_state=42):
     y = training_df['target_days_to_next']  # Days until next transfusion
     
     # Split data
-    print("\n3. Splitting data into train/test sets...")
+    print("\n2. Splitting data into train/test sets...")
     X_train, X_test, y_train, y_test = train_test_split(
         X, y, test_size=test_size, random_state=random_state
     )
@@ -94,7 +95,7 @@ def train_model(n_patients=200, test_size=0.2, random_state=42):
     test_data = lgb.Dataset(X_test, label=y_test, reference=train_data)
     
     # Train model
-    print("\n4. Training LightGBM model...")
+    print("\n3. Training LightGBM model...")
     model = lgb.train(
         params,
         train_data,
@@ -108,7 +109,7 @@ def train_model(n_patients=200, test_size=0.2, random_state=42):
     )
     
     # Make predictions
-    print("\n5. Evaluating model...")
+    print("\n4. Evaluating model...")
     y_pred_train = model.predict(X_train, num_iteration=model.best_iteration)
     y_pred_test = model.predict(X_test, num_iteration=model.best_iteration)
     
@@ -146,7 +147,7 @@ def train_model(n_patients=200, test_size=0.2, random_state=42):
     feature_importance = dict(zip(feature_columns, model.feature_importance(importance_type='gain')))
     sorted_importance = sorted(feature_importance.items(), key=lambda x: x[1], reverse=True)
     
-    print("\n6. Feature Importance (Top 5):")
+    print("\n5. Feature Importance (Top 5):")
     for i, (feature, importance) in enumerate(sorted_importance[:5], 1):
         print(f"   {i}. {feature}: {importance:.2f}")
     
@@ -154,13 +155,14 @@ def train_model(n_patients=200, test_size=0.2, random_state=42):
     os.makedirs('models', exist_ok=True)
     model_path = 'models/transfusion_predictor.pkl'
     joblib.dump(model, model_path)
-    print(f"\n7. Model saved to {model_path}")
+    print(f"\n6. Model saved to {model_path}")
     
-    # Save feature columns and importance
+    # Save feature columns, importance and reference sketches for drift monitoring
     model_info = {
         'feature_columns': feature_columns,
         'feature_importance': feature_importance,
         'metrics': metrics,
+        'reference_sketches': build_reference_sketches(X_train, feature_columns),
         'trained_at': datetime.now().isoformat(),
         'model_version': '1.0.0',
     }